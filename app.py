@@ -6,11 +6,17 @@
 #
 
 import streamlit as st
-import pandas as pd
 import json
+import os
+import math
+import numpy as np
 from io import BytesIO
-from pydantic import BaseModel
-from tools import convert_units, print_measurements, plot_lighting_diagram, calculate_max_ppi
+from typing import NamedTuple
+from tools import (convert_units, print_measurements, plot_lighting_diagram, lighting_diagram_lock, calculate_max_ppi,
+                   MM_PER_IN, CM_PER_IN)
+
+# factors to convert the object measurements to inches, keyed by unit of measurement
+INCHES_PER_UNIT = {"mm": 1 / MM_PER_IN, "cm": 1 / CM_PER_IN, "inches": 1.0}
 
 
 # ==============================
@@ -18,20 +24,89 @@ from tools import convert_units, print_measurements, plot_lighting_diagram, calc
 # ==============================
 
 
-class Sensor(BaseModel):
+class Sensor(NamedTuple):
     sensor_w_mm: float
     sensor_h_mm: float
     sensor_w_px: int
     sensor_h_px: int
+    # derived quantities, precomputed once at load time
+    mm_per_px_w: float
+    mm_per_px_h: float
+
+    @classmethod
+    def from_dims(cls, sensor_w_mm: float, sensor_h_mm: float, sensor_w_px: int, sensor_h_px: int) -> "Sensor":
+        """
+        Create a Sensor from its physical and pixel dimensions, precomputing the derived quantities
+
+        :param sensor_w_mm: sensor width in mm
+        :param sensor_h_mm: sensor height in mm
+        :param sensor_w_px: sensor width in pixels
+        :param sensor_h_px: sensor height in pixels
+        :return: Sensor
+        """
+
+        return cls(sensor_w_mm,
+                   sensor_h_mm,
+                   sensor_w_px,
+                   sensor_h_px,
+                   mm_per_px_w=sensor_w_mm / sensor_w_px,
+                   mm_per_px_h=sensor_h_mm / sensor_h_px)
+
+
+@st.cache_resource(show_spinner=False, max_entries=1)
+def load_sensors(path: str, mtime: float) -> dict[str, Sensor]:
+    """
+    Load the dictionary of digital camera bodies and backs with sensor size and pixel dimensions
+
+    Cached so the json is parsed and validated once rather than on every rerun. The file's modification
+    time is part of the cache key, so editing the file reloads it without restarting the app.
+
+    :param path: path to the sensors json file
+    :param mtime: modification time of the sensors json file
+    :return: dictionary of sensor name to Sensor
+    """
+
+    with open(path, "r") as file:
+        sensor_dict = json.load(file)
+
+    return {name: Sensor.from_dims(**attr) for name, attr in sensor_dict.items()}
+
+
+SENSORS_PATH = "data/sensors.json"
+sensors = load_sensors(SENSORS_PATH, os.path.getmtime(SENSORS_PATH))
+
 
+@st.cache_data(show_spinner=False, max_entries=32)
+def render_lighting_diagram(real_object_width: float,
+                            real_object_height: float,
+                            radius_multiply: float,
+                            distance: float,
+                            max_w_in: float,
+                            max_h_in: float) -> tuple[bytes, float, float]:
+    """
+    Render the lighting diagram to png bytes
 
-sensors: dict[str, Sensor] = {}
+    Cached on the scalar inputs so reruns with the same parameters skip drawing and rasterizing the figure.
+
+    :return: tuple of png bytes, light distance x, and light distance y
+    """
+
+    # Create a buffer for the figure
+    buf = BytesIO()
+
+    # the figure is shared between sessions, render it before another session updates it
+    with lighting_diagram_lock:
+        fig, light_1x, light_1y = plot_lighting_diagram(real_object_width,
+                                                        real_object_height,
+                                                        radius_multiply,
+                                                        distance,
+                                                        max_w_in,
+                                                        max_h_in)
+        # Save the figure in the buffer
+        fig.savefig(buf, format='png')
+
+    return buf.getvalue(), light_1x, light_1y
 
-# load the dictionary of digital camera bodies and backs with sensor size and pixel dimensions
-with open("data/sensors.json", "r") as file:
-    sensor_dict = json.loads(file.read())
-    for name, attr in sensor_dict.items():
-        sensors[name] = Sensor(**attr)
 
 # ==============================
 # ========= Streamlit ==========
@@ -48,141 +123,137 @@ st.divider()
 # ==============================
 
 with (st.sidebar):
-    # select the camera or digital back name
-    st.selectbox(label="Camera body / digital back",
-                 key="camera",
-                 options=sensors.keys()
-                 )
-
-    # select the lens focal length
-    st.selectbox(label="Lens focal length",
-                 key="lens_focal_len_mm",
-                 options=[24, 45, 50, 55, 85, 90, 100, 105, 110, 120, 135, 150, 200, 240],
-                 index=7
-                 )
-
-    # set the object width, physical measurement
-    st.number_input(label="Object width",
-                    key="real_object_width",
-                    min_value=0.0,
-                    max_value=100000.0,
-                    step=0.01,
-                    value=10.00
-                    )
-
-    # set the object height, physical measurement
-    st.number_input(label="Object height",
-                    key="real_object_height",
-                    min_value=0.0,
-                    max_value=100000.0,
-                    step=0.01,
-                    value=8.00
-                    )
-
-    # select the unit of measurement used to measure the width and height of the artwork
-    st.selectbox(label="Unit of measurement",
-                 key="real_object_units",
-                 options=["mm", "cm", "inches"],
-                 index=2,
-                 )
-
-    # set the desired resolution in pixels per inch (ppi)
-    st.number_input(label="Resolution (ppi)",
-                    key="set_ppi",
-                    min_value=72,
-                    max_value=2000,
-                    step=1,
-                    value=300
-                    )
-
-    # Set to desired radius multiplier to control light coverage.
-    st.slider(label="Light coverage",
-              key="radius_multiply",
-              min_value=1.0,
-              max_value=5.0,
-              step=0.05,
-              value=3.0
-              )
+    # batch the form fields so changing them does not rerun the app until Calculate is pressed
+    with st.form("params"):
+        # select the camera or digital back name
+        st.selectbox(label="Camera body / digital back",
+                     key="camera",
+                     options=sensors.keys()
+                     )
+
+        # select the lens focal length
+        st.selectbox(label="Lens focal length",
+                     key="lens_focal_len_mm",
+                     options=[24, 45, 50, 55, 85, 90, 100, 105, 110, 120, 135, 150, 200, 240],
+                     index=7
+                     )
+
+        # set the object width, physical measurement
+        st.number_input(label="Object width",
+                        key="real_object_width",
+                        min_value=0.0,
+                        max_value=100000.0,
+                        step=0.01,
+                        value=10.00
+                        )
+
+        # set the object height, physical measurement
+        st.number_input(label="Object height",
+                        key="real_object_height",
+                        min_value=0.0,
+                        max_value=100000.0,
+                        step=0.01,
+                        value=8.00
+                        )
+
+        # select the unit of measurement used to measure the width and height of the artwork
+        st.selectbox(label="Unit of measurement",
+                     key="real_object_units",
+                     options=["mm", "cm", "inches"],
+                     index=2,
+                     )
+
+        # set the desired resolution in pixels per inch (ppi)
+        st.number_input(label="Resolution (ppi)",
+                        key="set_ppi",
+                        min_value=72,
+                        max_value=2000,
+                        step=1,
+                        value=300
+                        )
+
+        # Set to desired radius multiplier to control light coverage.
+        st.slider(label="Light coverage",
+                  key="radius_multiply",
+                  min_value=1.0,
+                  max_value=5.0,
+                  step=0.05,
+                  value=3.0
+                  )
+
+        st.form_submit_button("Calculate")
 
     # ==============================
     # ========= Calculate ==========
     # ==============================
 
     sensor = sensors[st.session_state.camera]
-    sensor_ratio = sensor.sensor_w_px / sensor.sensor_h_px
 
-    # convert real object width and height to inches if provided in cm or mm
-    if st.session_state.real_object_units == 'cm':
-        real_object_width = st.session_state.real_object_width * 0.393701
-        real_object_height = st.session_state.real_object_height * 0.393701
-
-    elif st.session_state.real_object_units == 'mm':
-        real_object_width = st.session_state.real_object_width * 0.0393701
-        real_object_height = st.session_state.real_object_height * 0.0393701
-
-    else:
-        real_object_width = st.session_state.real_object_width
-        real_object_height = st.session_state.real_object_height
+    # convert real object width and height to inches if provided in cm or mm, the converted values are
+    # kept in local variables because writing them back to the widget-bound session state would convert
+    # them again on the next rerun
+    inches_per_unit = INCHES_PER_UNIT[st.session_state.real_object_units]
+    real_object_width = st.session_state.real_object_width * inches_per_unit
+    real_object_height = st.session_state.real_object_height * inches_per_unit
 
     # check max ppi
-    if st.session_state.set_ppi > (max_ppi := calculate_max_ppi(sensor, real_object_width, real_object_height)):
+    max_ppi = calculate_max_ppi(sensor.sensor_w_px, sensor.sensor_h_px, real_object_width, real_object_height)
+    if st.session_state.set_ppi > max_ppi:
         st.warning((f"Warning! The object does not fit in frame at {st.session_state.set_ppi}ppi. "
                     f"The maximum possible ppi is {max_ppi}"))
 
+    # the object resolution is the set ppi by construction
+    PPI = st.session_state.set_ppi
+
+    # width and height of the object in inches, of the sensor in mm and pixels, and of a sensor pixel in mm
+    object_in = np.array([real_object_width, real_object_height])
+    sensor_mm = np.array([sensor.sensor_w_mm, sensor.sensor_h_mm])
+    sensor_px = np.array([sensor.sensor_w_px, sensor.sensor_h_px])
+    mm_per_px = np.array([sensor.mm_per_px_w, sensor.mm_per_px_h])
+
     # calculate object width and height in pixels by multiplying ppi by object measurements in inches
-    object_w_px = int(st.session_state.set_ppi * real_object_width)
-    object_h_px = int(st.session_state.set_ppi * real_object_height)
-
-    # calculate object width and height in mm on sensor by multiplying sensor size in mm by object
-    # size in pixels and dividing by the sensor size in pixels
-    object_w_on_film_mm = (sensor.sensor_w_mm * object_w_px) / sensor.sensor_w_px
-    object_h_on_film_mm = (sensor.sensor_h_mm * object_h_px) / sensor.sensor_h_px
-
-    # calculate object resolution by dividing object in pixels by object in inches (should equal set_ppi value)
-    PPI = object_w_px / real_object_width
-
-    # calculate camera distance to object by multiplying object width by lens focal length and dividing
-    # by object size on sensor
-    distance = (real_object_width * st.session_state.lens_focal_len_mm) / object_w_on_film_mm
-    # distance_ft_in = int(distance/12)
-
-    # calculate sensor usage
-    sensor_usage_w = round((object_w_on_film_mm / sensor.sensor_w_mm) * 100, 2)
-    sensor_usage_h = round((object_h_on_film_mm / sensor.sensor_h_mm) * 100, 2)
-    max_w_in = sensor.sensor_w_px / PPI
-    max_h_in = sensor.sensor_h_px / PPI
-
-    # check light coverage
-    if (real_object_width * st.session_state.radius_multiply) / 2 < max_w_in / 2:
-        _radius = st.session_state.radius_multiply + 0.05
-        while (real_object_width * _radius) / 2 < max_w_in / 2:
-            _radius += 0.05
+    object_px = PPI * object_in
+    object_w_px, object_h_px = np.rint(object_px).astype(int).tolist()
+
+    # calculate object width and height in mm on sensor by multiplying the unrounded object size in pixels
+    # by the size of a sensor pixel in mm
+    object_on_film_mm = object_px * mm_per_px
+
+    # calculate camera distance to object by dividing lens focal length by the size on sensor of one inch
+    # of the object, the object size cancels out so the distance depends only on ppi, sensor, and lens
+    distance = st.session_state.lens_focal_len_mm / (PPI * sensor.mm_per_px_w)
+
+    # calculate sensor usage, whether the object fits on the sensor, and the image area in inches
+    sensor_usage_w, sensor_usage_h = np.round(object_on_film_mm / sensor_mm * 100, 2).tolist()
+    fits_w, fits_h = (object_on_film_mm <= sensor_mm).tolist()
+    max_w_in, max_h_in = (sensor_px / PPI).tolist()
+
+    # check light coverage, the light radius must be at least half the image area width
+    if (min_radius := max_w_in / real_object_width) > st.session_state.radius_multiply:
+        # round the minimum radius multiplier up to the next light coverage slider step
+        _radius = math.ceil(round(min_radius / 0.05, 9)) * 0.05
 
         st.warning("Warning! The light coverage does not cover the entire viewing area. "
                    f"Increase light coverage to a minimum of {round(_radius, 2)}")
 
-if object_w_on_film_mm > sensor.sensor_w_mm:
+if not fits_w:
     st.warning("Warning! The object width does not fit in frame.")
-if object_h_on_film_mm > sensor.sensor_h_mm:
+if not fits_h:
     st.warning("Warning! The object height does not fit in frame.")
 
-lighting_diagram, light_1x, light_1y = plot_lighting_diagram(real_object_width,
-                                                             real_object_height,
-                                                             st.session_state.radius_multiply,
-                                                             distance,
-                                                             max_w_in,
-                                                             max_h_in)
+lighting_diagram, light_1x, light_1y = render_lighting_diagram(real_object_width,
+                                                               real_object_height,
+                                                               st.session_state.radius_multiply,
+                                                               distance,
+                                                               max_w_in,
+                                                               max_h_in)
 
 # ============================
 # ====== Plot diagrams =======
 # ============================
 
-# Create a buffer for the figure
-buf = BytesIO()
-# Save the figure in the buffer
-lighting_diagram.savefig(buf, format='png')
-# Display the figure buffer image
-st.image(buf)
+# Display the rendered figure image, scaled to the width of the page
+st.image(lighting_diagram, use_container_width=True)
 
 # st.pyplot(fig=lighting_diagram)
 
@@ -201,6 +272,5 @@ summary = [("Camera", st.session_state.camera),
            ("Object resolution (ppi)", f"{PPI}")
            ]
 
-df = pd.DataFrame(data=summary, columns=[0, 1])
-
-st.table(df)
+st.table({"Parameter": [name for name, _ in summary],
+          "Value": [value for _, value in summary]})
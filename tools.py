@@ -6,26 +6,37 @@
 #
 
 
-from typing import Literal
-from numpy import floor
+from typing import Literal, NamedTuple
+from functools import lru_cache
+from math import floor
 from fractions import Fraction
-import matplotlib.pyplot as plt
-import matplotlib.patches as patches
-import matplotlib.lines as lines
+from threading import Lock
+from matplotlib.axes import Axes
+from matplotlib.figure import Figure
+from matplotlib.patches import Circle, FancyArrow, Rectangle
+from matplotlib.collections import LineCollection, PatchCollection
+from matplotlib.text import Text
 
+# exact conversion factors, one inch is defined as 25.4 mm
+MM_PER_IN = 25.4
+CM_PER_IN = 2.54
 
-def calculate_max_ppi(sensor, real_object_width, real_object_height):
+
+@lru_cache(maxsize=128)
+def calculate_max_ppi(sensor_w_px: int, sensor_h_px: int, real_object_width: float, real_object_height: float) -> int:
     """
+    Calculate the maximum resolution at which the object still fits in frame
 
-    :param sensor:
-    :param real_object_width:
-    :param real_object_height:
-    :return:
+    :param sensor_w_px: sensor width in pixels
+    :param sensor_h_px: sensor height in pixels
+    :param real_object_width: object width in inches
+    :param real_object_height: object height in inches
+    :return: maximum ppi
     """
 
-    sensor_ratio = sensor.sensor_w_px / sensor.sensor_h_px
-    max_w_px = int(floor(sensor.sensor_w_px / real_object_width))
-    max_h_px = int(floor(sensor.sensor_h_px / real_object_height))
+    sensor_ratio = sensor_w_px / sensor_h_px
+    max_w_px = floor(sensor_w_px / real_object_width)
+    max_h_px = floor(sensor_h_px / real_object_height)
 
     if real_object_width >= real_object_height * sensor_ratio:
         return max_w_px
@@ -43,132 +54,150 @@ def convert_units(measurement: float, unit: Literal["mm", "cm", "inches"] = "inc
     """
 
     if unit == 'cm':
-        measurement = measurement * 0.393701
+        inches = measurement / CM_PER_IN
     elif unit == 'mm':
-        measurement = measurement * 0.0393701
+        inches = measurement / MM_PER_IN
+    else:
+        inches = measurement
 
-    return measurement / .0393701, measurement / .393701, measurement
+    return inches * MM_PER_IN, inches * CM_PER_IN, inches
 
 
 def print_measurements(measurements: tuple[float, float, float]) -> str:
     """
     Utility to format a string of measurements for printing
 
-    Example output: "4088.9 mm / 408.89 cm / 160.98 in / 13 ft 4 49/50 in"
+    Example output: "4088.89 mm / 408.89 cm / 160.98 in / 13 ft 4 49/50 in"
 
     :param measurements: tuple of measurements mm, cm, in
     :return: string
     """
 
     mm, cm, inches = measurements
-    string = ""
-    string += str(round(mm, 2)) + " mm / "
-    string += str(round(cm, 2)) + " cm / "
-    string += str(round(inches, 2)) + " in / "
-    if inches // 12 > 0:
-        string += str(int(inches // 12)) + " ft"
-    if floor(inches % 12) > 0:
-        string += " " + str(int(floor(inches % 12)))
-    if round(inches - int(inches), 1) > 0:
-        string += " " + str(Fraction(str(round(inches - int(inches), 2))))
-    string += " in"
-
-    return string
-
-
-def plot_lighting_diagram(real_object_width, real_object_height, radius_multiply, distance, max_w_in, max_h_in):
+    # split the inches, rounded to hundredths, into feet, whole inches, and a fraction of an inch
+    feet, hundredths = divmod(round(inches * 100), 1200)
+    whole, hundredths = divmod(hundredths, 100)
+
+    parts = [f"{mm:.2f} mm / {cm:.2f} cm / {inches:.2f} in /"]
+    if feet:
+        parts.append(f"{feet} ft")
+    if whole or not hundredths:
+        parts.append(f"{whole}")
+    if hundredths:
+        parts.append(f"{Fraction(hundredths, 100)}")
+    parts.append("in")
+
+    return " ".join(parts)
+
+
+class _LightingDiagram(NamedTuple):
+    fig: Figure
+    ax: Axes
+    camera_view: Rectangle
+    artwork: Rectangle
+    circle: Circle
+    areas: PatchCollection
+    guides: LineCollection
+    camera_arrow: FancyArrow
+    light_1_arrow: FancyArrow
+    light_2_arrow: FancyArrow
+    camera_label: Text
+    light_1_label: Text
+    light_2_label: Text
+    image_area_label: Text
+    object_label: Text
+    light_1x_label: Text
+    light_1y_label: Text
+    distance_label: Text
+
+
+# the lighting diagram figure is reused between calls, hold this lock while updating and rendering it
+lighting_diagram_lock = Lock()
+
+
+@lru_cache(maxsize=None)
+def _lighting_diagram_template() -> _LightingDiagram:
     """
-    Plots the lighting diagram using Matplotlib with emojis.
+    Create the lighting diagram figure once, with placeholder geometry for every artist
+
+    :return: the figure, axes, and the artists updated by plot_lighting_diagram
     """
 
-    # Create a figure and axes
-    fig, ax = plt.subplots(1, figsize=(6,5), dpi=300)
+    # Create a figure and axes, without registering the figure with pyplot
+    fig = Figure(figsize=(6, 5), dpi=100)
+    ax = fig.add_subplot(111)
 
     # Camera image area
-    camera_view = patches.Rectangle(((-max_w_in / 2), (-max_h_in / 2)),
-                                    max_w_in,
-                                    max_h_in,
-                                    fc='#FF7F00',  # Orange
-                                    ec="#FF0000",  # Red
-                                    lw=1.0,
-                                    alpha=1.0)
-    ax.add_patch(camera_view)
+    camera_view = Rectangle((0, 0),
+                            1,
+                            1,
+                            fc='#FF7F00',  # Orange
+                            ec="#FF0000",  # Red
+                            lw=1.0,
+                            alpha=1.0)
 
     # Artwork rectangle
-    artwork = patches.Rectangle(((-real_object_width / 2), (-real_object_height / 2)),
-                                real_object_width,
-                                real_object_height,
-                                fc='#B0E2FF',  # Light Steel Blue
-                                ec="#4682B4",  # Steel Blue
-                                lw=1.2,
-                                alpha=1.0)
-    ax.add_patch(artwork)
-
-    # Radius calculation
-    radius = (real_object_width * radius_multiply) / 2
+    artwork = Rectangle((0, 0),
+                        1,
+                        1,
+                        fc='#B0E2FF',  # Light Steel Blue
+                        ec="#4682B4",  # Steel Blue
+                        lw=1.2,
+                        alpha=1.0)
 
     # Add a yellow circle between the lights
-    circle = patches.Circle((0, 0), radius=radius, color='#FFD700', alpha=0.2)
-    ax.add_patch(circle)
+    circle = Circle((0, 0), radius=1, color='#FFD700', alpha=0.2)
+
+    # Add the patches to the axes in a single collection, keeping each patch's own colors
+    areas = ax.add_collection(PatchCollection([camera_view, artwork, circle], match_original=True))
 
     # Add an "x" at the center of the rectangle
     ax.text(0, 0, "x", fontsize=10, ha='center', va='center', color='black')
 
     # Camera placement arrow
-    ax.arrow(0.0, distance, 0.0, -distance * 0.95,  # Changed start and end points
-             lw=1.5, color='#000000',
-             alpha=1.0,
-             head_width=0.35, head_length=0.6,  # Reduced head size
-             overhang=0.0,  # No overhang
-             length_includes_head=True)
+    camera_arrow = ax.arrow(0.0, 1.0, 0.0, -0.95,
+                            lw=1.5, color='#000000',
+                            alpha=1.0,
+                            head_width=0.35, head_length=0.6,  # Reduced head size
+                            overhang=0.0,  # No overhang
+                            length_includes_head=True)
 
     # Light 1 arrow
-    light_1x = radius * 2.5
-    light_1y = radius * 2
-    ax.arrow(light_1x, light_1y, -light_1x * 0.95, -light_1y * 0.95,  # Changed start and end points
-             lw=1.5, color='#000000',
-             head_width=0.35, head_length=0.6,  # Reduced head size
-             overhang=0,
-             length_includes_head=True)
-
-    light_1a = lines.Line2D((light_1x, light_1x), (0, light_1y), lw=1.5, linestyle=':', color='#778899')
-    light_1b = lines.Line2D((light_1x, 0), (0, 0), lw=1.5, linestyle=':',
-                            color='#778899')
+    light_1_arrow = ax.arrow(1.0, 1.0, -0.95, -0.95,
+                             lw=1.5, color='#000000',
+                             head_width=0.35, head_length=0.6,  # Reduced head size
+                             overhang=0,
+                             length_includes_head=True)
 
     # Light 2 arrow
-    light_2x = -radius * 2.5
-    light_2y = radius * 2
-    ax.arrow(light_2x, light_2y, -light_2x * 0.95, -light_2y * 0.95,  # Changed start and end points
-             lw=1.5, color='#000000',
-             head_width=0.35, head_length=0.6,  # Reduced head size
-             overhang=0,
-             length_includes_head=True)
+    light_2_arrow = ax.arrow(-1.0, 1.0, 0.95, -0.95,
+                             lw=1.5, color='#000000',
+                             head_width=0.35, head_length=0.6,  # Reduced head size
+                             overhang=0,
+                             length_includes_head=True)
 
-    # Add elements to the axes
-    ax.add_line(light_1a)
-    ax.add_line(light_1b)
+    # Add the light 1 distance guide lines to the axes in a single collection
+    guides = ax.add_collection(LineCollection([[(0, 0), (0, 0)], [(0, 0), (0, 0)]], linewidths=1.5,
+                                              linestyles=':', colors='#778899', zorder=2))
 
     # Add text annotations
-    ax.text(0, distance * 1.025, "camera", fontsize=10, ha='center', va='bottom', color="#101010")
-    ax.text(light_1x, light_1y * 1.025, "light", fontsize=10, ha='center', va='bottom', color="#101010")
-    ax.text(light_2x, light_2y * 1.025, "light", fontsize=10, ha='center', va='bottom', color="#101010")
-    ax.text(-max_w_in / 2, -max_h_in / 2, "image area", fontsize=8, ha='left', va='top',
-            color="#101010")  # Image area
-    ax.text(-real_object_width / 2, -real_object_height / 2, "object", fontsize=8, ha='left', va='bottom',
-            color="#101010")  # Object area
+    camera_label = ax.text(0, 0, "camera", fontsize=10, ha='center', va='bottom', color="#101010")
+    light_1_label = ax.text(0, 0, "light", fontsize=10, ha='center', va='bottom', color="#101010")
+    light_2_label = ax.text(0, 0, "light", fontsize=10, ha='center', va='bottom', color="#101010")
+    image_area_label = ax.text(0, 0, "image area", fontsize=8, ha='left', va='top',
+                               color="#101010")  # Image area
+    object_label = ax.text(0, 0, "object", fontsize=8, ha='left', va='bottom',
+                           color="#101010")  # Object area
 
     # Add labels for light distances
-    ax.text(light_1x / 1.5, -1, f'{light_1x:.2f} in', fontsize=8, ha='center', va='top',
-            color='black')  # Label for light_1x distance
-    ax.text(light_1x - 1, light_1y / 2.5, f'{light_1y:.2f} in', fontsize=8, ha='right', va='center',
-            color='black')  # Label for light_1y distance
-    ax.text(-1, distance / 1.5, f'{distance:.2f} in', fontsize=8, ha='right', va='center',
-            color='black')  # Label for light_2x distance
-
-    # Set axis limits and styling
-    ax.set_ylim(-distance * 0.5, distance * 1.2)  # Adjusted ylim
-    ax.set_xlim(-light_1x * 1.2, light_1x * 1.2)  # Adjusted xlim
-    ax.axis('equal')
+    light_1x_label = ax.text(0, 0, "", fontsize=8, ha='center', va='top',
+                             color='black')  # Label for light_1x distance
+    light_1y_label = ax.text(0, 0, "", fontsize=8, ha='right', va='center',
+                             color='black')  # Label for light_1y distance
+    distance_label = ax.text(0, 0, "", fontsize=8, ha='right', va='center',
+                             color='black')  # Label for light_2x distance
+
+    # Set axis styling
     ax.tick_params(axis='both', labelsize=8)
 
     # Add grid
@@ -184,4 +213,77 @@ def plot_lighting_diagram(real_object_width, real_object_height, radius_multiply
     ax.spines['top'].set_visible(False)
     ax.spines['right'].set_visible(False)
 
-    return fig, light_1x, light_1y
+    return _LightingDiagram(fig, ax, camera_view, artwork, circle, areas, guides,
+                            camera_arrow, light_1_arrow, light_2_arrow,
+                            camera_label, light_1_label, light_2_label, image_area_label, object_label,
+                            light_1x_label, light_1y_label, distance_label)
+
+
+def plot_lighting_diagram(real_object_width, real_object_height, radius_multiply, distance, max_w_in, max_h_in):
+    """
+    Plots the lighting diagram using Matplotlib with emojis.
+
+    The same figure is updated and returned on every call, callers should hold lighting_diagram_lock
+    until they are done rendering it.
+    """
+
+    d = _lighting_diagram_template()
+    ax = d.ax
+
+    # Camera image area
+    d.camera_view.set_bounds((-max_w_in / 2), (-max_h_in / 2), max_w_in, max_h_in)
+
+    # Artwork rectangle
+    d.artwork.set_bounds((-real_object_width / 2), (-real_object_height / 2), real_object_width, real_object_height)
+
+    # Radius calculation
+    radius = (real_object_width * radius_multiply) / 2
+
+    # Yellow circle between the lights
+    d.circle.set_radius(radius)
+
+    # Update the collection with the new patch geometry
+    d.areas.set_paths([d.camera_view, d.artwork, d.circle])
+
+    # Camera placement arrow
+    d.camera_arrow.set_data(x=0.0, y=distance, dx=0.0, dy=-distance * 0.95)
+
+    # Light 1 arrow
+    light_1x = radius * 2.5
+    light_1y = radius * 2
+    d.light_1_arrow.set_data(x=light_1x, y=light_1y, dx=-light_1x * 0.95, dy=-light_1y * 0.95)
+
+    # Light 1 distance guides
+    d.guides.set_segments([[(light_1x, 0), (light_1x, light_1y)], [(light_1x, 0), (0, 0)]])
+
+    # Light 2 arrow
+    light_2x = -radius * 2.5
+    light_2y = radius * 2
+    d.light_2_arrow.set_data(x=light_2x, y=light_2y, dx=-light_2x * 0.95, dy=-light_2y * 0.95)
+
+    # Move text annotations
+    d.camera_label.set_position((0, distance * 1.025))
+    d.light_1_label.set_position((light_1x, light_1y * 1.025))
+    d.light_2_label.set_position((light_2x, light_2y * 1.025))
+    d.image_area_label.set_position((-max_w_in / 2, -max_h_in / 2))  # Image area
+    d.object_label.set_position((-real_object_width / 2, -real_object_height / 2))  # Object area
+
+    # Update labels for light distances
+    d.light_1x_label.set_position((light_1x / 1.5, -1))  # Label for light_1x distance
+    d.light_1x_label.set_text(f'{light_1x:.2f} in')
+    d.light_1y_label.set_position((light_1x - 1, light_1y / 2.5))  # Label for light_1y distance
+    d.light_1y_label.set_text(f'{light_1y:.2f} in')
+    d.distance_label.set_position((-1, distance / 1.5))  # Label for light_2x distance
+    d.distance_label.set_text(f'{distance:.2f} in')
+
+    # Recompute the data limits from the updated artists, dropping those of the previous call
+    ax.relim()
+    for collection in (d.areas, d.guides):
+        ax.update_datalim(collection.get_datalim(ax.transData).get_points())
+
+    # Set axis limits
+    ax.set_ylim(-distance * 0.5, distance * 1.2)  # Adjusted ylim
+    ax.set_xlim(-light_1x * 1.2, light_1x * 1.2)  # Adjusted xlim
+    ax.axis('equal')
+
+    return d.fig, light_1x, light_1y